@@ -0,0 +1,60 @@
+"""
+Ahead-of-time build of the setlist search kernels.
+
+Run once, with Numba installed, from this directory:
+
+    python _solver_native.py
+
+This writes the `mvm_solver_native` extension module next to this file.
+When it is importable, `mvm_showcase_order` calls it directly: there is no
+JIT warm-up, and Numba is not needed at run time.
+"""
+import os
+
+import numpy as np
+from numba import types
+from numba.pycc import CC
+from numba.typed import Dict
+
+from mvm_showcase_order import DEAD_KEY, KERNEL_VERSION, _count_paths_native, _expand, _fill_paths
+
+cc = CC("mvm_solver_native")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+@cc.export("kernel_version", "i8()")
+def kernel_version():
+    """KERNEL_VERSION at build time; a mismatch makes the solver skip this module."""
+    return KERNEL_VERSION
+
+
+@cc.export("enumerate_paths", "i4[:,:](i8[:], i8[:], i8, b1, i8)")
+def enumerate_paths(adj_r, pins, pinned_mask, canonical, limit):
+    """First `limit` setlists (as rank indices) of the pinned search."""
+    n = adj_r.shape[0]
+    path = np.zeros(n, dtype=np.int64)
+    order = np.zeros((n, n), dtype=np.int64)
+    keys = np.zeros((n, n), dtype=np.int64)
+    ptr = np.zeros(n, dtype=np.int64)
+    cnt = np.zeros(n, dtype=np.int64)
+    mark = np.zeros(n, dtype=np.int64)
+    dead = Dict.empty(key_type=DEAD_KEY, value_type=types.boolean)
+    state = np.zeros(3, dtype=np.int64)
+    out_paths = np.empty((limit, n), dtype=np.int32)
+
+    _expand(adj_r, n, pins, pinned_mask, canonical, path, order, keys, ptr, cnt, dead, 0, 0)
+    filled = _fill_paths(
+        adj_r, n, pins, pinned_mask, canonical,
+        path, order, keys, ptr, cnt, mark, dead, state, out_paths,
+    )
+    return out_paths[:filled].copy()
+
+
+@cc.export("count_paths", "i8[:](i8[:], i8, i8)")
+def count_paths(adj, n, start):
+    """Per-end-team Hamiltonian path counts; see `_count_paths_native`."""
+    return _count_paths_native(adj, n, start)
+
+
+if __name__ == "__main__":
+    cc.compile()
@@ -1,5 +1,293 @@
+import sys
+import warnings
 from functools import lru_cache
-from typing import Dict, Set, List, Iterator, Optional, Tuple
+from operator import and_
+from typing import Dict, FrozenSet, Set, List, Iterator, Optional, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit, types
+    from numba.typed import Dict as NumbaDict
+    HAVE_NUMBA = True
+    # (first, last, used_mask) keys of the kernels' dead-state memo
+    DEAD_KEY = types.UniTuple(types.int64, 3)
+except ImportError:  # Numba is optional; the pure-Python backtracker is used instead
+    HAVE_NUMBA = False
+
+    def njit(**kwargs):
+        return lambda fn: fn
+
+# Bump whenever the kernels' behaviour or the exported signatures change, so
+# an older build of mvm_solver_native is ignored rather than called
+KERNEL_VERSION = 2
+
+try:  # ahead-of-time build of the kernels, see _solver_native.py
+    import mvm_solver_native as _aot
+except ImportError:
+    _aot = None
+
+_aot_count_paths = _aot_enumerate_paths = None
+if _aot is not None:
+    # Builds older than the version export have no kernel_version at all
+    _aot_kernel_version = getattr(_aot, "kernel_version", None)
+    if _aot_kernel_version is not None and _aot_kernel_version() == KERNEL_VERSION:
+        _aot_count_paths = _aot.count_paths
+        _aot_enumerate_paths = _aot.enumerate_paths
+    else:
+        warnings.warn("mvm_solver_native is out of date and will not be used; re-run _solver_native.py")
+
+# int64 bitmasks: keep clear of the sign bit
+NATIVE_MAX_TEAMS = 62
+# Rows filled per call into the native kernel before handing results back
+NATIVE_BATCH_SIZE = 1024
+# Bounded searches asking for fewer setlists stay in Python: loading the JIT
+# kernels costs more than finding them
+JIT_MIN_LIMIT = 50_000
+# Smaller graphs are counted in Python, for the same reason
+JIT_MIN_COUNT_TEAMS = 14
+# From this many teams on, the pairwise member test runs in NumPy
+NUMPY_GRAPH_MIN_TEAMS = 128
+# Largest team count for the (2**n, n) counting table: 20! still fits in int64
+DP_MAX_TEAMS = 20
+
+if hasattr(int, "bit_count"):
+    _bit_count = int.bit_count
+else:  # Python < 3.10: 16-bit lookup table
+    POPCNT16 = bytes(bin(i).count("1") for i in range(65536))
+
+    def _bit_count(m: int) -> int:
+        total = 0
+        while m:
+            total += POPCNT16[m & 0xFFFF]
+            m >>= 16
+        return total
+
+
+def _reachable_mask(adj_r: List[int], start: int, allowed: int) -> int:
+    """Bitmask of nodes reachable from `start` moving only through `allowed` nodes."""
+    frontier = reached = 1 << start
+    while frontier:
+        nxt = 0
+        x = frontier
+        while x:
+            lsb = x & -x
+            nxt |= adj_r[lsb.bit_length() - 1]
+            x ^= lsb
+        frontier = nxt & allowed & ~reached
+        reached |= frontier
+    return reached
+
+
+@lru_cache(maxsize=128)
+def _count_paths(adj: Tuple[int, ...], start: Optional[int], end: Optional[int]) -> int:
+    """
+    Held-Karp style count of Hamiltonian paths. Keyed on the adjacency
+    itself, so solvers built from the same data share results.
+
+    Uses the compiled bottom-up table when available (ahead-of-time build
+    first, then Numba from JIT_MIN_COUNT_TEAMS on); otherwise evaluates the
+    recurrence top-down so only reachable (last, used_mask) states are visited.
+    """
+    n = len(adj)
+    count_native = _aot_count_paths
+    if count_native is None and HAVE_NUMBA and n >= JIT_MIN_COUNT_TEAMS:
+        count_native = _count_paths_native
+    if count_native is not None and n <= DP_MAX_TEAMS:
+        last_counts = count_native(
+            np.asarray(adj, dtype=np.int64), n, -1 if start is None else start
+        )
+        return int(last_counts.sum() if end is None else last_counts[end])
+
+    full_mask = (1 << n) - 1
+
+    @lru_cache(maxsize=None)
+    def count_from(last: int, used_mask: int) -> int:
+        if used_mask == full_mask:
+            return 1 if end is None or last == end else 0
+        total = 0
+        x = adj[last] & ~used_mask
+        while x:
+            lsb = x & -x
+            total += count_from(lsb.bit_length() - 1, used_mask | lsb)
+            x ^= lsb
+        return total
+
+    starts = [start] if start is not None else range(n)
+    return sum(count_from(s, 1 << s) for s in starts)
+
+
+def _pin_array(pins_r: Dict[int, int], n: int) -> Tuple[np.ndarray, int]:
+    """Pins as the kernels take them: team per slot (-1 = free) and a mask of pinned teams."""
+    pins = np.full(n, -1, dtype=np.int64)
+    for pos, r in pins_r.items():
+        pins[pos] = r
+    return pins, sum(1 << r for r in set(pins_r.values()))
+
+
+# ---------- Native search kernel (Numba) ----------
+
+@njit(cache=True)
+def _popcount(x):
+    """SWAR popcount for a non-negative int64."""
+    x = x - ((x >> 1) & 0x5555555555555555)
+    x = (x & 0x3333333333333333) + ((x >> 2) & 0x3333333333333333)
+    x = (x + (x >> 4)) & 0x0F0F0F0F0F0F0F0F
+    return (x * 0x0101010101010101) >> 56
+
+
+@njit(cache=True)
+def _reachable_mask_native(adj_r, start, allowed):
+    """Compiled twin of `_reachable_mask`."""
+    frontier = 1 << start
+    reached = frontier
+    while frontier:
+        nxt = 0
+        x = frontier
+        while x:
+            lsb = x & -x
+            nxt |= adj_r[_popcount(lsb - 1)]
+            x ^= lsb
+        frontier = nxt & allowed & ~reached
+        reached |= frontier
+    return reached
+
+
+@njit(cache=True)
+def _count_paths_native(adj, n, start):
+    """
+    Bottom-up Held-Karp: dp[mask, v] = number of paths covering exactly
+    `mask` and ending at v. Masks are visited in increasing order, which
+    finishes every subset before its supersets. Returns dp[full_mask], the
+    per-end-team counts. `start` is -1 when unconstrained.
+    """
+    dp = np.zeros((1 << n, n), dtype=np.int64)
+    if start >= 0:
+        dp[1 << start, start] = 1
+    else:
+        for v in range(n):
+            dp[1 << v, v] = 1
+
+    for mask in range(1, 1 << n):
+        for v in range(n):
+            ways = dp[mask, v]
+            if ways == 0:
+                continue
+            x = adj[v] & ~mask
+            while x:
+                lsb = x & -x
+                x ^= lsb
+                dp[mask | lsb, _popcount(lsb - 1)] += ways
+    return dp[(1 << n) - 1].copy()
+
+
+@njit(cache=True)
+def _expand(adj_r, n, pins, pinned_mask, canonical, path, order, keys, ptr, cnt, dead, depth, used_mask):
+    """
+    Fill `order[depth]` with the candidates for slot `depth`, fewest future
+    options first (stable, so ties keep index order like the Python path).
+    Each candidate's remaining degree is computed once and kept alongside
+    it in `keys[depth]` for the insertion sort to compare against.
+    Candidates left with no onward neighbour are dropped unless they fill
+    the last slot. States recorded in `dead` get no candidates at all.
+    `pins[d]` is the team forced into slot d, or -1; `pinned_mask` covers
+    every pinned team. With `canonical`, only paths whose last team ranks
+    above their first are produced; dead states are then also keyed on the
+    first team, since it decides which last teams are allowed.
+    """
+    full_mask = (1 << n) - 1
+    if depth == 0:
+        allowed = full_mask
+    else:
+        last = path[depth - 1]
+        allowed = adj_r[last] & ~used_mask
+        # prune: every unused node must still be reachable from `last`
+        unused = full_mask & ~used_mask
+        if (path[0] if canonical else -1, last, used_mask) in dead:
+            allowed = 0
+        elif _reachable_mask_native(adj_r, last, unused) & unused != unused:
+            allowed = 0
+
+    # pinned teams may only fill their own slot
+    if pins[depth] >= 0:
+        allowed &= 1 << pins[depth]
+    else:
+        allowed &= ~pinned_mask
+
+    # canonical orientation: the last team ranks above the first
+    if canonical and 0 < depth == n - 1:
+        allowed &= ~((2 << path[0]) - 1)
+
+    k = 0
+    while allowed:
+        lsb = allowed & -allowed
+        allowed ^= lsb
+        c = _popcount(lsb - 1)
+        if depth == 0:
+            order[depth, k] = c
+        else:
+            # insertion sort on remaining degree
+            key = _popcount(adj_r[c] & ~used_mask)
+            if key == 0 and depth < n - 1:
+                continue
+            j = k
+            while j > 0 and keys[depth, j - 1] > key:
+                order[depth, j] = order[depth, j - 1]
+                keys[depth, j] = keys[depth, j - 1]
+                j -= 1
+            order[depth, j] = c
+            keys[depth, j] = key
+        k += 1
+    ptr[depth] = 0
+    cnt[depth] = k
+
+
+@njit(cache=True)
+def _fill_paths(adj_r, n, pins, pinned_mask, canonical, path, order, keys, ptr, cnt, mark, dead, state, out_paths):
+    """
+    Iterative DFS over Hamiltonian paths. Resumable: `state` holds
+    (depth, used_mask, paths found so far) between calls, depth == -1 once
+    the search is exhausted. `mark[d]` is the path count when slot `d` was
+    opened; if it is unchanged when the slot runs out, the state that opened
+    it is recorded in `dead` (see `_expand` for the key).
+    Writes up to len(out_paths) complete paths and returns how many it wrote.
+    """
+    depth = state[0]
+    used_mask = state[1]
+    total = state[2]
+    filled = 0
+    while depth >= 0 and filled < out_paths.shape[0]:
+        if ptr[depth] == cnt[depth]:
+            if depth > 0 and mark[depth] == total:
+                dead[(path[0] if canonical else -1, path[depth - 1], used_mask)] = True
+            depth -= 1
+            if depth >= 0:
+                used_mask &= ~(1 << path[depth])
+            continue
+
+        c = order[depth, ptr[depth]]
+        ptr[depth] += 1
+        path[depth] = c
+
+        if depth == n - 1:
+            # pins were already enforced by _expand
+            out_paths[filled, :] = path
+            filled += 1
+            total += 1
+            continue
+
+        used_mask |= 1 << c
+        depth += 1
+        mark[depth] = total
+        _expand(
+            adj_r, n, pins, pinned_mask, canonical, path, order, keys, ptr, cnt, dead, depth, used_mask
+        )
+
+    state[0] = depth
+    state[1] = used_mask
+    state[2] = total
+    return filled
+
 
 class SetlistSolver:
     """
@@ -11,31 +299,63 @@ class SetlistSolver:
         if not teams_to_members:
             raise ValueError("Input `teams_to_members` cannot be empty.")
 
-        # Light sanitization: strip whitespace around member names
-        self.teams_to_members: Dict[str, Set[str]] = {
-            team: {str(m).strip() for m in members}
+        # Light sanitization: strip whitespace around member names. Names are
+        # interned (one shared, hash-cached string per member) and the sets
+        # frozen, since nothing mutates them after construction.
+        self.teams_to_members: Dict[str, FrozenSet[str]] = {
+            team: frozenset(sys.intern(str(m).strip()) for m in members)
             for team, members in teams_to_members.items()
         }
 
         self.teams: List[str] = list(self.teams_to_members.keys())
         self.team_count: int = len(self.teams)
         self.team_to_idx: Dict[str, int] = {team: i for i, team in enumerate(self.teams)}
+
+        # Every member gets one bit; each team is the OR of its members' bits
+        self._members: List[str] = sorted(
+            {m for members in self.teams_to_members.values() for m in members}
+        )
+        self._member_to_bit: Dict[str, int] = {m: 1 << k for k, m in enumerate(self._members)}
+        self._team_mask: List[int] = [
+            sum(self._member_to_bit[m] for m in self.teams_to_members[team])
+            for team in self.teams
+        ]
+
         self.adjacency_masks: List[int] = self._build_compatibility_graph()
 
     def _build_compatibility_graph(self) -> List[int]:
-        """Bitmask adjacency: adj[i] has bit j set iff team i is compatible with j."""
+        """
+        Bitmask adjacency: adj[i] has bit j set iff team i is compatible with j.
+        A pair is compatible iff the AND of their member masks is zero.
+        """
+        if self.team_count >= NUMPY_GRAPH_MIN_TEAMS:
+            return self._build_compatibility_graph_numpy(self._team_mask, len(self._members))
+
         adj = [0] * self.team_count
-        for i, team_i in enumerate(self.teams):
-            members_i = self.teams_to_members[team_i]
+        for i, bits_i in enumerate(self._team_mask):
             mask = 0
-            for j, team_j in enumerate(self.teams):
-                if i == j:
-                    continue
-                if self.teams_to_members[team_j].isdisjoint(members_i):
+            for j, bits_j in enumerate(self._team_mask):
+                if i != j and not bits_i & bits_j:
                     mask |= (1 << j)
             adj[i] = mask
         return adj
 
+    def _build_compatibility_graph_numpy(self, team_bits: List[int], member_count: int) -> List[int]:
+        """Same as above with member bits packed into uint64 words, one row per team."""
+        words = max(1, (member_count + 63) // 64)
+        word_mask = (1 << 64) - 1
+        packed = np.array(
+            [[(bits >> (64 * w)) & word_mask for w in range(words)] for bits in team_bits],
+            dtype=np.uint64,
+        )
+        adj = [0] * self.team_count
+        for i in range(self.team_count):
+            compatible = ~(packed & packed[i]).any(axis=1)
+            compatible[i] = False
+            row = np.packbits(compatible, bitorder="little")
+            adj[i] = int.from_bytes(row.tobytes(), "little")
+        return adj
+
     # ---------- Generate valid setlists (optional start/end constraints) ----------
 
     def generate_valid_setlists(
@@ -44,127 +364,325 @@ class SetlistSolver:
         start_team: Optional[str] = None,
         end_team: Optional[str] = None,
         debug: bool = False,
+        validate: bool = False,
+        position_constraints: Optional[Dict[int, str]] = None,
+        include_reversed: bool = True,
     ) -> Iterator[List[str]]:
         """
-        Backtracking + heuristics. Before yielding, we STRICTLY validate that
-        each adjacent pair shares no members (guarding against data issues).
+        Backtracking + heuristics. The search only steps between compatible
+        teams, so results are valid by construction. With `validate` (or
+        `debug`) each adjacent pair is re-checked against the member sets
+        before yielding, as a guard against data issues.
+
+        `position_constraints` maps a 0-indexed position to the team that
+        must perform there; like `start_team`/`end_team`, these are enforced
+        during the search rather than filtered afterwards. Pinning a slot to
+        two teams, or a team to two slots, raises ValueError.
+
+        With `include_reversed=False`, a setlist and its exact reverse are
+        yielded only once. That only matters when the pins read the same
+        backwards (e.g. nothing pinned); otherwise a reversed setlist can't
+        satisfy them anyway.
         """
         if start_team and start_team not in self.team_to_idx:
             raise ValueError(f"Start team '{start_team}' not found.")
         if end_team and end_team not in self.team_to_idx:
             raise ValueError(f"End team '{end_team}' not found.")
 
+        # Start/end are just pins on the first/last slot
+        pinned_teams = dict(position_constraints or {})
+        for pos, team in ((0, start_team), (self.team_count - 1, end_team)):
+            if team and pinned_teams.setdefault(pos, team) != team:
+                raise ValueError(f"Position {pos} is pinned to both '{pinned_teams[pos]}' and '{team}'.")
+        pinned_at: Dict[str, int] = {}
+        for pos, team in pinned_teams.items():
+            if team not in self.team_to_idx:
+                raise ValueError(f"Team '{team}' not found.")
+            if not 0 <= pos < self.team_count:
+                raise ValueError(f"Position {pos} is out of range for {self.team_count} teams.")
+            if pinned_at.setdefault(team, pos) != pos:
+                raise ValueError(f"Team '{team}' is pinned to both position {pinned_at[team]} and {pos}.")
+
         # Heuristic: try nodes with fewer neighbors first (tighter first)
         ranked_indices = sorted(
             range(self.team_count),
-            key=lambda i: bin(self.adjacency_masks[i]).count("1")
+            key=lambda i: _bit_count(self.adjacency_masks[i])
         )
-        idx_to_rank = {orig: r for r, orig in enumerate(ranked_indices)}
+        rank_of = [0] * self.team_count
+        for r, orig in enumerate(ranked_indices):
+            rank_of[orig] = r
 
-        # Reindex adjacency + names according to ranking
+        # Reindex adjacency + names according to ranking. adj_r stays a list of
+        # ints: on CPython, indexing it beats both packed rows and array('q').
         adj_r = [0] * self.team_count
         teams_r = [self.teams[i] for i in ranked_indices]
         for i in range(self.team_count):
-            original_mask = self.adjacency_masks[i]
+            x = self.adjacency_masks[i]
             m = 0
-            for j in range(self.team_count):
-                if (original_mask >> j) & 1:
-                    m |= (1 << idx_to_rank[j])
-            adj_r[idx_to_rank[i]] = m
+            while x:
+                lsb = x & -x
+                m |= (1 << rank_of[lsb.bit_length() - 1])
+                x ^= lsb
+            adj_r[rank_of[i]] = m
+
+        pins_r = {pos: rank_of[self.team_to_idx[team]] for pos, team in pinned_teams.items()}
+        canonical = not include_reversed and all(
+            pins_r.get(self.team_count - 1 - pos) == r for pos, r in pins_r.items()
+        )
 
-        start_node_r = idx_to_rank[self.team_to_idx[start_team]] if start_team else None
-        end_node_r   = idx_to_rank[self.team_to_idx[end_team]]   if end_team   else None
+        # The prebuilt module fills all `limit` rows in one call, so it only
+        # takes requests that fit in a single batch
+        use_aot = _aot_enumerate_paths is not None and limit is not None and limit <= NATIVE_BATCH_SIZE
+        use_jit = HAVE_NUMBA and (limit is None or limit >= JIT_MIN_LIMIT)
+        if self.team_count <= NATIVE_MAX_TEAMS and (use_aot or use_jit):
+            adj_arr = np.asarray(adj_r, dtype=np.int64)
+            pins, pinned_mask = _pin_array(pins_r, self.team_count)
+            if use_aot:
+                # Bounded request: one call into the prebuilt module, no JIT warm-up
+                blocks = [_aot_enumerate_paths(adj_arr, pins, pinned_mask, canonical, max(limit, 0))]
+            else:
+                blocks = self._backtrack_native(adj_arr, pins, pinned_mask, canonical)
+            # Convert to team names a whole block at a time
+            teams_r_arr = np.array(teams_r, dtype=object)
+            seqs = (seq for block in blocks for seq in teams_r_arr[block].tolist())
+        else:
+            paths = self._backtrack_with_pins(adj_r, pins_r, canonical)
+            seqs = ([teams_r[i] for i in path_indices] for path_indices in paths)
 
         produced = 0
-        for path_indices in self._backtrack_with_end(adj_r, start_node_r, end_node_r):
+        for seq in seqs:
             if limit is not None and produced >= limit:
                 return
 
-            # Convert to team names
-            seq = [teams_r[i] for i in path_indices]
-
             # STRICT VALIDATION: verify every adjacent pair has disjoint members
-            ok, conflict = self._sequence_is_valid(seq)
-            if not ok:
-                if debug:
-                    a, b, overlap = conflict
-                    print(f"[skip invalid] {a} -> {b} shares members: {sorted(overlap)}")
-                continue
+            if validate or debug:
+                ok, conflict = self._sequence_is_valid(seq)
+                if not ok:
+                    if debug:
+                        a, b, overlap = conflict
+                        print(f"[skip invalid] {a} -> {b} shares members: {sorted(overlap)}")
+                    continue
 
             yield seq
             produced += 1
 
-    def _backtrack_with_end(
+    def _backtrack_with_pins(
         self,
         adj_r: List[int],
-        start_node_r: Optional[int],
-        end_node_r: Optional[int],
+        pins_r: Dict[int, int],
+        canonical: bool = False,
     ) -> Iterator[List[int]]:
         """
-        Enforce fixed end by forbidding `end_node_r` until last slot and
-        forcing it at the final step (if reachable).
+        Enforce pinned slots (start, end, fixed positions) by forbidding each
+        pinned team everywhere except its own slot, and forcing it there
+        (if reachable). With `canonical`, the last team must rank above the
+        first, so only one orientation of each setlist is produced.
+
+        Iterative DFS with one candidate list per slot, mirroring the native
+        kernel. The yielded path list is reused, so copy it before advancing.
         """
         n = self.team_count
-        path: List[int] = []
-        used_mask = 0
-
-        def solve():
-            nonlocal used_mask
-            L = len(path)
-            if L == n:
-                if end_node_r is None or path[-1] == end_node_r:
-                    yield path.copy()
-                return
-
+        full_mask = (1 << n) - 1
+        pins: List[Optional[int]] = [pins_r.get(L) for L in range(n)]
+        pinned_mask = sum(1 << r for r in set(pins_r.values()))
+        # (first, last, used_mask) states already shown to have no valid
+        # completion; `first` only matters (and is only set) when canonical
+        dead: Set[Tuple[int, int, int]] = set()
+
+        path = [0] * n
+        candidates_stack: List[List[int]] = [[] for _ in range(n)]
+        pos = [0] * n    # next candidate to try in each slot
+        mark = [0] * n   # `found` when each slot was opened
+        team_bits = n.bit_length()
+        team_low = (1 << team_bits) - 1
+
+        def expand(L: int, used_mask: int) -> List[int]:
             if L == 0:
-                candidates = [start_node_r] if start_node_r is not None else list(range(n))
+                allowed = full_mask
             else:
-                last = path[-1]
+                last = path[L - 1]
+                key = (path[0] if canonical else -1, last, used_mask)
+                if key in dead:
+                    return []
                 allowed = adj_r[last] & ~used_mask
 
-                if end_node_r is not None and L < n - 1:
-                    allowed &= ~(1 << end_node_r)
+                # prune: every unused node must still be reachable from `last`
+                unused = full_mask & ~used_mask
+                if _reachable_mask(adj_r, last, unused) & unused != unused:
+                    dead.add(key)
+                    return []
 
-                if end_node_r is not None and L == n - 1:
-                    if (allowed >> end_node_r) & 1:
-                        allowed = (1 << end_node_r)
-                    else:
-                        return  # cannot reach required end
+            # pinned teams may only fill their own slot
+            if pins[L] is not None:
+                allowed &= (1 << pins[L])
+            else:
+                allowed &= ~pinned_mask
+
+            # canonical orientation: the last team ranks above the first
+            if canonical and 0 < L == n - 1:
+                allowed &= ~((2 << path[0]) - 1)
 
+            if L == 0:
                 candidates = []
                 x = allowed
                 while x:
                     lsb = x & -x
                     candidates.append(lsb.bit_length() - 1)
                     x ^= lsb
+                return candidates
+
+            # heuristic: fewest future options first; drop dead ends unless
+            # they fill the last slot. One or two candidates skip the sort.
+            pc = _bit_count(allowed)
+            if pc <= 1:
+                c = allowed.bit_length() - 1
+                if c < 0 or (L < n - 1 and not adj_r[c] & unused):
+                    return []
+                return [c]
+            if pc == 2:
+                lo = (allowed & -allowed).bit_length() - 1
+                hi = allowed.bit_length() - 1
+                d_lo = _bit_count(adj_r[lo] & unused)
+                d_hi = _bit_count(adj_r[hi] & unused)
+                if L < n - 1 and not (d_lo and d_hi):
+                    return [lo] if d_lo else [hi] if d_hi else []
+                return [lo, hi] if d_lo <= d_hi else [hi, lo]
+
+            # Otherwise pack (remaining degree, team) into one int as the
+            # bits are extracted: a plain int sort then gives the heuristic
+            # order (ties by team index), with no key dict or filtered copy.
+            keyed = []
+            x = allowed
+            while x:
+                lsb = x & -x
+                c = lsb.bit_length() - 1
+                d = _bit_count(adj_r[c] & unused)
+                if d or L == n - 1:
+                    keyed.append(d << team_bits | c)
+                x ^= lsb
+            keyed.sort()
+            return [k & team_low for k in keyed]
+
+        found = 0
+        used_mask = 0
+        depth = 0
+        candidates_stack[0] = expand(0, 0)
+        while depth >= 0:
+            candidates = candidates_stack[depth]
+            if pos[depth] == len(candidates):
+                # slot exhausted: remember dead states, then step back
+                if depth > 0 and mark[depth] == found:
+                    dead.add((path[0] if canonical else -1, path[depth - 1], used_mask))
+                depth -= 1
+                if depth >= 0:
+                    used_mask &= ~(1 << path[depth])
+                continue
 
-                # heuristic: fewest future options first
-                candidates.sort(key=lambda c: bin(adj_r[c] & ~used_mask).count("1"))
+            c = candidates[pos[depth]]
+            pos[depth] += 1
+            path[depth] = c
 
-            for c in candidates:
-                if (used_mask >> c) & 1:
-                    continue
-                path.append(c)
-                used_mask |= (1 << c)
-                yield from solve()
-                used_mask &= ~(1 << c)
-                path.pop()
+            if depth == n - 1:
+                found += 1
+                yield path
+                continue
+
+            used_mask |= (1 << c)
+            depth += 1
+            candidates_stack[depth] = expand(depth, used_mask)
+            pos[depth] = 0
+            mark[depth] = found
+
+    def _backtrack_native(
+        self,
+        adj_r: np.ndarray,
+        pins: np.ndarray,
+        pinned_mask: int,
+        canonical: bool = False,
+        batch: int = NATIVE_BATCH_SIZE,
+    ) -> Iterator[np.ndarray]:
+        """
+        Same search as `_backtrack_with_pins`, run by the compiled kernel.
+        Yields (k, n) int32 blocks of up to `batch` paths. Each block is a
+        view into a reused buffer, so consume it before advancing.
+        """
+        n = self.team_count
+        path = np.zeros(n, dtype=np.int64)
+        order = np.zeros((n, n), dtype=np.int64)
+        keys = np.zeros((n, n), dtype=np.int64)
+        ptr = np.zeros(n, dtype=np.int64)
+        cnt = np.zeros(n, dtype=np.int64)
+        mark = np.zeros(n, dtype=np.int64)
+        dead = NumbaDict.empty(key_type=DEAD_KEY, value_type=types.boolean)
+        state = np.zeros(3, dtype=np.int64)
+        out_paths = np.empty((batch, n), dtype=np.int32)
+
+        _expand(adj_r, n, pins, pinned_mask, canonical, path, order, keys, ptr, cnt, dead, 0, 0)
+        while state[0] >= 0:
+            filled = _fill_paths(
+                adj_r, n, pins, pinned_mask, canonical,
+                path, order, keys, ptr, cnt, mark, dead, state, out_paths,
+            )
+            yield out_paths[:filled]
+
+    # ---------- Count valid setlists ----------
+
+    def count_setlists(
+        self,
+        start_team: Optional[str] = None,
+        end_team: Optional[str] = None,
+        include_reversed: bool = True,
+    ) -> int:
+        """
+        Number of valid setlists, without enumerating them: completions are
+        counted per (last team, teams used) state and shared across branches.
+        Results are cached, so repeated queries are free.
+
+        `include_reversed=False` counts a setlist and its reverse once, as in
+        `generate_valid_setlists`; with no start/end every setlist has a
+        distinct reverse, so that halves the total.
+        """
+        if start_team and start_team not in self.team_to_idx:
+            raise ValueError(f"Start team '{start_team}' not found.")
+        if end_team and end_team not in self.team_to_idx:
+            raise ValueError(f"End team '{end_team}' not found.")
 
-        yield from solve()
+        start = self.team_to_idx[start_team] if start_team else None
+        end = self.team_to_idx[end_team] if end_team else None
+        total = _count_paths(tuple(self.adjacency_masks), start, end)
+        if not include_reversed and start is None and end is None and self.team_count > 1:
+            total //= 2
+        return total
 
     # ---------- Validation & Debug helpers ----------
 
     def _sequence_is_valid(self, seq: List[str]) -> Tuple[bool, Optional[Tuple[str, str, Set[str]]]]:
         """Return (True, None) if valid; else (False, (teamA, teamB, overlapping_members))."""
-        for a, b in zip(seq, seq[1:]):
-            overlap = self.teams_to_members[a] & self.teams_to_members[b]
+        masks = [self._team_mask[self.team_to_idx[team]] for team in seq]
+        # Each pair is a single AND; scan them in C and only walk the
+        # sequence in Python to report a conflict
+        if not any(map(and_, masks, masks[1:])):
+            return True, None
+        for k in range(len(seq) - 1):
+            overlap = masks[k] & masks[k + 1]
             if overlap:
-                return False, (a, b, overlap)
+                return False, (seq[k], seq[k + 1], self._members_of(overlap))
         return True, None
 
+    def _members_of(self, mask: int) -> Set[str]:
+        """Member names for the set bits of a member mask."""
+        names = set()
+        while mask:
+            lsb = mask & -mask
+            names.add(self._members[lsb.bit_length() - 1])
+            mask ^= lsb
+        return names
+
     def explain_pair(self, team_a: str, team_b: str) -> None:
         """Print the intersection (if any) for a quick manual check."""
-        inter = self.teams_to_members[team_a] & self.teams_to_members[team_b]
+        inter = self._members_of(
+            self._team_mask[self.team_to_idx[team_a]] & self._team_mask[self.team_to_idx[team_b]]
+        )
         if inter:
             print(f"{team_a} and {team_b} share: {sorted(inter)}")
         else:
@@ -208,61 +726,38 @@ if __name__ == "__main__":
         start = "go"
         end = "dope"
 
-        # First positional constraint
-        target_team_1 = "xoxz"
-        target_position_index_1 = 8
-
-        # Second positional constraint
-        target_team_2 = "bad_villain"
-        target_position_index_2 = 7
-
-        # Third positional constraint
-        target_team_3 = "siren"
-        target_position_index_3 = 11
-
-        # Fourth positional constraint
-        target_team_4 = "drip"
-        target_position_index_4 = 14
+        # Fixed middle positions (0-indexed position -> team)
+        position_constraints = {
+            8: "xoxz",
+            7: "bad_villain",
+            11: "siren",
+            14: "drip",
+        }
         # -----------------------------------------
-        
-        print(
-            f"\n--- Finding setlists starting with '{start}', ending with '{end}', "
-            f"with '{target_team_1}' in position {target_position_index_1 + 1}, "
-            f"'{target_team_2}' in position {target_position_index_2 + 1}, "
-            f"'{target_team_3}' in position {target_position_index_3 + 1}, "
-            f"and '{target_team_4}' in position {target_position_index_4 + 1} ---"
-        )
+
+        pinned = [f"'{team}' in position {pos + 1}" for pos, team in position_constraints.items()]
+        if len(pinned) > 1:
+            pinned[-1] = f"and {pinned[-1]}"
+        with_pins = f", with {(', ' if len(pinned) > 2 else ' ').join(pinned)}" if pinned else ""
+        print(f"\n--- Finding setlists starting with '{start}', ending with '{end}'{with_pins} ---")
 
         found_count = 0
         limit = 10  # Find up to 10 examples
 
-        # Call the generator with the start and end teams locked
+        # The generator enforces start, end, and all positional constraints
         generator = solver.generate_valid_setlists(
+            limit=limit,
             start_team=start,
-            end_team=end
+            end_team=end,
+            position_constraints=position_constraints,
         )
 
-        # Loop through the results and apply all positional checks
         for setlist in generator:
-            # Check all four positional constraints
-            if (
-                len(setlist) > target_position_index_1
-                and setlist[target_position_index_1] == target_team_1
-                and len(setlist) > target_position_index_2
-                and setlist[target_position_index_2] == target_team_2
-                and len(setlist) > target_position_index_3
-                and setlist[target_position_index_3] == target_team_3
-                and len(setlist) > target_position_index_4
-                and setlist[target_position_index_4] == target_team_4
-            ):
-                found_count += 1
-                print(f"{found_count}: {setlist}")
-
-            if found_count >= limit:
-                break
+            found_count += 1
+            print(f"{found_count}: {setlist}")
 
         if found_count == 0:
             print("No valid setlists found that satisfy all specified conditions.")
 
     except ValueError as e:
-        print(f"Error: {e}")
\ No newline at end of file
+        print(f"Error: {e}")
@@ -0,0 +1,162 @@
+import random
+from itertools import permutations
+
+import pytest
+
+import mvm_showcase_order as mso
+from mvm_showcase_order import NUMPY_GRAPH_MIN_TEAMS, SetlistSolver
+
+BACKENDS = ["python", pytest.param("jit", marks=pytest.mark.skipif(not mso.HAVE_NUMBA, reason="needs numba"))]
+
+
+def _random_teams(rng, team_count, member_count, team_size):
+    members = [f"m{k}" for k in range(member_count)]
+    return {f"t{i}": set(rng.sample(members, team_size)) for i in range(team_count)}
+
+
+def _expected_adjacency(solver):
+    sets = [solver.teams_to_members[team] for team in solver.teams]
+    return [
+        sum(1 << j for j, other in enumerate(sets) if i != j and mine.isdisjoint(other))
+        for i, mine in enumerate(sets)
+    ]
+
+
+def test_adjacency_matches_disjoint_member_sets():
+    rng = random.Random(1)
+    for team_count, member_count, team_size in ((1, 3, 2), (8, 12, 3), (16, 40, 5), (30, 70, 4)):
+        solver = SetlistSolver(_random_teams(rng, team_count, member_count, team_size))
+        assert solver.adjacency_masks == _expected_adjacency(solver)
+
+
+def test_numpy_adjacency_matches_disjoint_member_sets():
+    rng = random.Random(2)
+    # Above the threshold, and with members spread over several uint64 words
+    solver = SetlistSolver(_random_teams(rng, NUMPY_GRAPH_MIN_TEAMS + 5, 150, 6))
+    assert solver.adjacency_masks == _expected_adjacency(solver)
+
+    # Same builder on a small instance, against the loop builder
+    small = SetlistSolver(_random_teams(rng, 20, 90, 5))
+    numpy_adj = small._build_compatibility_graph_numpy(small._team_mask, len(small._members))
+    assert numpy_adj == small.adjacency_masks == _expected_adjacency(small)
+
+
+def _brute_force(solver, pins):
+    """Every ordering of the teams with disjoint neighbours and the pins in place."""
+    sets = solver.teams_to_members
+    return {
+        seq
+        for seq in permutations(solver.teams)
+        if all(sets[a].isdisjoint(sets[b]) for a, b in zip(seq, seq[1:]))
+        and all(seq[pos] == team for pos, team in pins.items())
+    }
+
+
+def _random_pins(rng, teams):
+    n = len(teams)
+    chosen = rng.sample(teams, rng.randint(0, min(3, n)))
+    return dict(zip(rng.sample(range(n), len(chosen)), chosen))
+
+
+def test_conflicting_pins_are_rejected():
+    solver = SetlistSolver({"a": {"x"}, "b": {"y"}, "c": {"z"}, "d": {"w"}})
+    for kwargs in (
+        {"position_constraints": {1: "b", 2: "b"}},
+        {"start_team": "a", "position_constraints": {2: "a"}},
+        {"start_team": "a", "end_team": "a"},
+        {"start_team": "a", "position_constraints": {0: "b"}},
+    ):
+        with pytest.raises(ValueError):
+            next(solver.generate_valid_setlists(**kwargs))
+
+
+@pytest.fixture
+def backend(request, monkeypatch):
+    # Unbounded searches take the JIT kernel when Numba is on; the prebuilt
+    # module is only used for bounded ones, but keep it out of the way too
+    monkeypatch.setattr(mso, "HAVE_NUMBA", request.param == "jit")
+    monkeypatch.setattr(mso, "_aot_enumerate_paths", None)
+    monkeypatch.setattr(mso, "_aot_count_paths", None)
+    # The test graphs are small; still count them with the kernel under jit
+    monkeypatch.setattr(mso, "JIT_MIN_COUNT_TEAMS", 0)
+    # Counts are cached across solvers; each backend must compute its own
+    mso._count_paths.cache_clear()
+    yield request.param
+    mso._count_paths.cache_clear()
+
+
+@pytest.mark.parametrize("backend", BACKENDS, indirect=True)
+def test_setlists_match_brute_force(backend):
+    rng = random.Random(3)
+    for trial in range(60):
+        n = rng.randint(1, 7)
+        solver = SetlistSolver(_random_teams(rng, n, rng.randint(6, 12), rng.randint(1, 3)))
+        pins = _random_pins(rng, solver.teams)
+        if trial % 3 == 0:  # start/end, plus whatever fits in between
+            start, end = (rng.sample(solver.teams, 2) if n > 1 else (None, None))
+            pins = {p: t for p, t in pins.items() if 0 < p < n - 1 and t not in (start, end)}
+            if start:
+                pins.update({0: start, n - 1: end})
+        expected = _brute_force(solver, pins)
+
+        found = [tuple(seq) for seq in solver.generate_valid_setlists(position_constraints=pins)]
+        assert len(found) == len(set(found))
+        assert set(found) == expected
+
+        # A bounded search is a prefix of the unbounded one
+        k = rng.randint(0, len(found) + 1)
+        bounded = [tuple(seq) for seq in solver.generate_valid_setlists(limit=k, position_constraints=pins)]
+        assert bounded == found[:k]
+
+        if not pins:
+            start, end = (solver.teams[0], solver.teams[-1]) if n > 1 else (None, None)
+            assert solver.count_setlists() == len(expected)
+            assert solver.count_setlists(start, end) == sum(
+                1 for seq in expected if start in (None, seq[0]) and end in (None, seq[-1])
+            )
+
+
+@pytest.mark.parametrize("backend", BACKENDS, indirect=True)
+def test_one_orientation_per_setlist(backend):
+    rng = random.Random(4)
+    for trial in range(60):
+        n = rng.randint(1, 7)
+        solver = SetlistSolver(_random_teams(rng, n, rng.randint(6, 12), rng.randint(1, 3)))
+        # Only a lone middle pin reads the same backwards; others are unaffected
+        pins = {n // 2: rng.choice(solver.teams)} if n % 2 and trial % 2 else _random_pins(rng, solver.teams)
+        expected = _brute_force(solver, pins)
+
+        found = {tuple(seq) for seq in solver.generate_valid_setlists(position_constraints=pins, include_reversed=False)}
+        if all(pins.get(n - 1 - pos) == team for pos, team in pins.items()):
+            assert found | {seq[::-1] for seq in found} == expected
+            assert n == 1 or not found & {seq[::-1] for seq in found}
+            if not pins:
+                assert solver.count_setlists(include_reversed=False) == len(found)
+        else:
+            assert found == expected
+
+
+@pytest.mark.skipif(not mso.HAVE_NUMBA, reason="needs numba")
+def test_backends_yield_the_same_order(monkeypatch):
+    rng = random.Random(5)
+    solver = SetlistSolver(_random_teams(rng, 9, 14, 3))
+    pins = {0: solver.teams[2], 4: solver.teams[5]}
+    monkeypatch.setattr(mso, "_aot_enumerate_paths", None)
+    results = []
+    for have_numba in (False, True):
+        monkeypatch.setattr(mso, "HAVE_NUMBA", have_numba)
+        results.append([list(seq) for seq in solver.generate_valid_setlists(position_constraints=pins)])
+    assert results[0] and results[0] == results[1]
+
+
+@pytest.mark.skipif(mso._aot_enumerate_paths is None, reason="needs a current mvm_solver_native build")
+def test_prebuilt_module_matches_python(monkeypatch):
+    rng = random.Random(6)
+    for _ in range(20):
+        solver = SetlistSolver(_random_teams(rng, rng.randint(1, 9), 14, 3))
+        pins = _random_pins(rng, solver.teams)
+        monkeypatch.setattr(mso, "HAVE_NUMBA", False)
+        expected = [list(seq) for seq in solver.generate_valid_setlists(position_constraints=pins)]
+        for limit in (1, 7, mso.NATIVE_BATCH_SIZE):
+            found = list(solver.generate_valid_setlists(limit=limit, position_constraints=pins))
+            assert found == expected[:limit]